@@ -3,11 +3,20 @@ import pandas as pd
 import requests
 from io import BytesIO
 import os
+import sys
 import logging
 import re
 import traceback
+import json
+import time
+import gzip
+import hashlib
+import hmac
+import threading
+from collections import Counter
 from dotenv import load_dotenv
 import urllib.parse
+from audit_log import audit_log
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,7 +33,10 @@ translations = {
         'product_details': 'Product Details',
         'serial_number': 'Serial Number',
         'product_name': 'Product Name',
-        'product_description': 'Product Description'
+        'product_description': 'Product Description',
+        'scan_no_text': 'Point the camera at the serial number label',
+        'scan_hold_steady': 'Hold the camera steady',
+        'scan_reading': 'Reading serial number...'
     },
     'ar': {
         'success': 'هذا المنتج من إل جي سوريا',
@@ -35,7 +47,10 @@ translations = {
         'product_details': 'تفاصيل المنتج',
         'serial_number': 'الرقم التسلسلي',
         'product_name': 'اسم المنتج',
-        'product_description': 'وصف المنتج'
+        'product_description': 'وصف المنتج',
+        'scan_no_text': 'وجّه الكاميرا نحو ملصق الرقم التسلسلي',
+        'scan_hold_steady': 'امسك الكاميرا بثبات',
+        'scan_reading': 'جارٍ قراءة الرقم التسلسلي...'
     }
 }
 
@@ -70,6 +85,30 @@ if not os.path.exists(UPLOAD_FOLDER):
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
 
+# Optional WebSocket support for continuous camera scanning
+try:
+    from flask_sock import Sock, ConnectionClosed
+    sock = Sock(app)
+    SCAN_AVAILABLE = True
+except ImportError:
+    sock = None
+    SCAN_AVAILABLE = False
+    logger.info("flask-sock not installed - continuous scanning disabled")
+
+# Catalog generation: content hash of the last successfully parsed catalog.
+# Lookup responses from /api/serial are cacheable for CACHE_MAX_AGE seconds
+# and their ETags change whenever the generation does. Revalidations are only
+# answered from the known generation for CATALOG_CHECK_INTERVAL seconds after
+# the catalog was last read, so a changed sheet is noticed that quickly.
+CACHE_MAX_AGE = int(os.getenv('CACHE_MAX_AGE', '300'))
+CATALOG_CHECK_INTERVAL = float(os.getenv('CATALOG_CHECK_INTERVAL', '30'))
+catalog_state = {'generation': None, 'loaded_at': 0.0, 'url': None}
+lookup_context = threading.local()
+
+# Match marker from lookup_serial when the catalog could not be read or used,
+# so an outage is not mistaken for a serial missing from the catalog
+CATALOG_ERROR = 'catalog_error'
+
 def get_message(key, lang='en'):
     """Get translated message"""
     if lang not in translations:
@@ -133,8 +172,16 @@ def read_excel_file(content):
     # If both fail, raise the last exception with details
     raise Exception(f"Failed to read Excel file. Errors: {'; '.join(exceptions)}")
 
-def check_serial_in_excel(serial_number, excel_url):
-    """Check if serial number exists in Excel file"""
+def lookup_serial(serial_number, excel_url):
+    """Check if serial number exists in Excel file
+
+    Returns (found, product_name, product_description, match) where match is
+    'exact', 'fuzzy', CATALOG_ERROR or None (not in the catalog).
+    lookup_context.generation is set to the catalog generation when the
+    catalog was read successfully.
+    """
+    lookup_context.generation = None
+    catalog_url = excel_url
     try:
         logger.info(f"Checking serial number: {serial_number}")
         
@@ -142,7 +189,7 @@ def check_serial_in_excel(serial_number, excel_url):
         excel_url, is_valid = validate_excel_url(excel_url)
         if not is_valid:
             logger.warning("URL validation failed")
-            return False, None, None
+            return False, None, None, CATALOG_ERROR
             
         logger.info(f"Validated Excel URL: {excel_url}")
         
@@ -158,11 +205,13 @@ def check_serial_in_excel(serial_number, excel_url):
         
         if response.status_code != 200:
             logger.warning(f"Failed to fetch Excel file. Status code: {response.status_code}")
-            return False, None, None
+            return False, None, None, CATALOG_ERROR
         
         # Try to read the Excel file
         df = read_excel_file(response.content)
         logger.info(f"Successfully read Excel file with {len(df)} rows")
+        generation = hashlib.sha1(response.content).hexdigest()[:16]
+        catalog_state.update(generation=generation, loaded_at=time.time(), url=catalog_url)
         logger.info(f"Excel columns: {df.columns.tolist()}")
         
         # Clean up column names by removing whitespace
@@ -196,7 +245,7 @@ def check_serial_in_excel(serial_number, excel_url):
         
         if serial_column is None:
             logger.warning("No serial number column found. Available columns: " + ", ".join(df.columns))
-            return False, None, None
+            return False, None, None, CATALOG_ERROR
         
         # Look for product name column (اسم المادة)
         product_name_column = None
@@ -230,6 +279,8 @@ def check_serial_in_excel(serial_number, excel_url):
         # Log final column assignments
         logger.info(f"Column assignments - Serial: {serial_column}, Name: {product_name_column}, Description/Code: {product_desc_column}")
         
+        lookup_context.generation = generation
+
         # Convert serial numbers to string for comparison and clean them
         df[serial_column] = df[serial_column].astype(str).str.strip()
         serial_number = str(serial_number).strip()
@@ -255,7 +306,7 @@ def check_serial_in_excel(serial_number, excel_url):
             if product_desc_column and product_desc_column in matching_rows.columns:
                 product_description = matching_rows.iloc[0][product_desc_column]
             
-            return True, product_name, product_description
+            return True, product_name, product_description, 'exact'
         
         # If no exact match, try fuzzy matching for OCR errors
         logger.info("Attempting fuzzy matching for potential OCR errors...")
@@ -299,15 +350,30 @@ def check_serial_in_excel(serial_number, excel_url):
                 if product_desc_column and product_desc_column in fuzzy_rows.columns:
                     product_description = fuzzy_rows.iloc[0][product_desc_column]
                 
-                return True, product_name, product_description
+                return True, product_name, product_description, 'fuzzy'
         
         logger.info("No exact or fuzzy match found")
-        return False, None, None
+        return False, None, None, None
         
     except Exception as e:
         logger.error(f"Error checking serial number: {str(e)}")
         traceback.print_exc()
-        return False, None, None
+        lookup_context.generation = None
+        return False, None, None, CATALOG_ERROR
+
+def check_serial_in_excel(serial_number, excel_url):
+    """Check if serial number exists in Excel file"""
+    return lookup_serial(serial_number, excel_url)[:3]
+
+def audit_verification(serial_number, source, found, match):
+    """Queue an audit record for a verification (source: manual, ocr, scan or api)"""
+    if found:
+        result = 'fuzzy' if match == 'fuzzy' else 'found'
+    elif match == CATALOG_ERROR:
+        result = CATALOG_ERROR
+    else:
+        result = 'not_found'
+    audit_log.record(normalize_serial(serial_number), source, result)
 
 # Enhanced OCR function
 def extract_serial_from_image(image_file):
@@ -382,8 +448,13 @@ def index():
 
 @app.route('/health')
 def health():
-    """Health check endpoint"""
-    return jsonify({"status": "ok"}), 200
+    """Health check endpoint, with preprocessing timings once OCR has been used"""
+    data = {"status": "ok", "scan_available": SCAN_AVAILABLE}
+    # Only report if already imported; importing here would load the OCR models
+    ocr_module = sys.modules.get('enhanced_ocr')
+    if ocr_module is not None:
+        data['preprocess'] = ocr_module.enhanced_ocr.preprocess_report()
+    return jsonify(data), 200
 
 @app.route('/check_serial', methods=['POST'])
 def check_serial():
@@ -399,7 +470,8 @@ def check_serial():
         return jsonify({'error': 'Please enter a serial number'}), 400
     
     logger.info(f"Checking serial number: {serial_number}")
-    is_valid, product_name, product_description = check_serial_in_excel(serial_number.strip(), excel_url)
+    is_valid, product_name, product_description, match = lookup_serial(serial_number.strip(), excel_url)
+    audit_verification(serial_number, 'manual', is_valid, match)
     
     response_data = {
         'valid': is_valid,
@@ -434,13 +506,15 @@ def upload_serial_image():
     serial_number, extraction_info = extract_serial_from_image(file)
     
     if not serial_number:
+        audit_log.record(None, 'ocr', 'ocr_failed')
         return jsonify({
             'error': get_message('error_ocr', lang),
             'extracted_text': extraction_info or 'Could not process image'
         }), 400
     
     # Check the extracted serial number
-    is_valid, product_name, product_description = check_serial_in_excel(serial_number, excel_url)
+    is_valid, product_name, product_description, match = lookup_serial(serial_number, excel_url)
+    audit_verification(serial_number, 'ocr', is_valid, match)
     
     response_data = {
         'serial_number': serial_number,
@@ -455,6 +529,204 @@ def upload_serial_image():
     
     return jsonify(response_data)
 
+@app.route('/audit/summary')
+def audit_summary():
+    """Recent verification counts and most repeated not-found serials"""
+    # Fail closed: the summary exposes fraud-analysis data, so it needs a token.
+    # Header only, so the secret never lands in access logs
+    token = os.getenv('AUDIT_TOKEN')
+    supplied = request.headers.get('X-Audit-Token')
+    if not token or supplied is None or not hmac.compare_digest(supplied.encode('utf-8'),
+                                                               token.encode('utf-8')):
+        return jsonify({'error': 'Forbidden'}), 403
+
+    hours = min(max(request.args.get('hours', 24, type=int), 1), 24 * 90)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    return jsonify(audit_log.summary(hours=hours, limit=limit))
+
+def serial_etag(serial_norm, lang, generation):
+    """ETag for a lookup answer: changes with the serial, language and catalog"""
+    return hashlib.sha1(f"{generation}:{serial_norm}:{lang}".encode('utf-8')).hexdigest()[:20]
+
+def cacheable(response, etag):
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = f'public, max-age={CACHE_MAX_AGE}'
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.route('/api/serial/<path:serial>')
+def api_serial(serial):
+    """Cacheable JSON lookup mirroring /check_serial
+
+    Responses carry a weak ETag derived from the normalized serial and the
+    catalog generation, so browsers and proxies can revalidate with 304s.
+    """
+    lang = request.args.get('lang', 'en')
+    if lang not in translations:
+        lang = 'en'
+    excel_url = os.getenv('EXCEL_URL')
+
+    if not excel_url:
+        response = jsonify({'error': get_message('error_excel', lang)})
+        response.headers['Cache-Control'] = 'no-store'
+        return response, 400
+
+    serial_norm = normalize_serial(serial)
+    if not serial_norm:
+        return jsonify({'error': 'Please enter a serial number'}), 400
+
+    # Answer revalidations from a recently confirmed generation without reading the catalog
+    generation = catalog_state['generation']
+    if (generation and catalog_state['url'] == excel_url
+            and time.time() - catalog_state['loaded_at'] < CATALOG_CHECK_INTERVAL):
+        etag = serial_etag(serial_norm, lang, generation)
+        if request.if_none_match.contains_weak(etag):
+            return cacheable(app.response_class(status=304), etag)
+
+    is_valid, product_name, product_description, match = lookup_serial(serial_norm, excel_url)
+    audit_verification(serial_norm, 'api', is_valid, match)
+
+    response_data = {
+        'valid': is_valid,
+        'message': get_message('success' if is_valid else 'not_found', lang),
+        'serial_number': serial_norm
+    }
+    if is_valid:
+        response_data['product_name'] = product_name
+        response_data['product_description'] = product_description
+
+    response = jsonify(response_data)
+
+    generation = lookup_context.generation
+    if not generation:
+        # Catalog could not be read; do not let anything cache a false "not found"
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    etag = serial_etag(serial_norm, lang, generation)
+    if request.if_none_match.contains_weak(etag):
+        return cacheable(app.response_class(status=304), etag)
+
+    # Quality-aware: 'gzip;q=0' is a refusal, which plain membership would ignore
+    if request.accept_encodings['gzip'] > 0:
+        response.set_data(gzip.compress(response.get_data(), compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return cacheable(response, etag)
+
+def scan_serial(ws):
+    """Continuous camera scan: binary frames in, JSON status and result out
+
+    Frames are scored cheaply and only the best recent frame goes through
+    OCR; the result is sent as soon as a scanned serial is found.
+    """
+    from frame_scanner import FrameSelector, decode_frame, score_frame, SCAN_TIMEOUT
+
+    excel_url = os.getenv('EXCEL_URL')
+    lang = request.args.get('lang', 'en')
+
+    def send(payload):
+        ws.send(json.dumps(payload, default=str))
+
+    if not excel_url:
+        send({'type': 'error', 'error': get_message('error_excel', lang)})
+        return
+
+    selector = FrameSelector()
+    deadline = time.monotonic() + SCAN_TIMEOUT
+    candidates = Counter()
+    outcomes = {}
+    last_info = None
+    stopped = False
+    resolved = False
+
+    try:
+        while not stopped and not selector.exhausted and time.monotonic() < deadline:
+            data = ws.receive(timeout=max(0.1, deadline - time.monotonic()))
+            if data is None:
+                break
+
+            # Frames that queued up while OCR was running are scored together
+            messages = [data]
+            while True:
+                more = ws.receive(timeout=0)
+                if more is None:
+                    break
+                messages.append(more)
+
+            quality = None
+            for message in messages:
+                if isinstance(message, str):
+                    stopped = stopped or message.strip() == 'stop'
+                    continue
+                image = decode_frame(message)
+                if image is None:
+                    continue
+                quality = score_frame(image)
+                selector.offer(message, quality['score'])
+
+            if not selector.should_run():
+                if quality:
+                    if not quality['text_lines']:
+                        hint = 'scan_no_text'
+                    elif not quality['score']:
+                        hint = 'scan_hold_steady'
+                    else:
+                        hint = 'scan_reading'
+                    send({'type': 'status', 'message': get_message(hint, lang),
+                          'frames': selector.frames_seen, 'sharpness': round(quality['sharpness'], 1),
+                          'text_lines': quality['text_lines']})
+                continue
+
+            send({'type': 'status', 'message': get_message('scan_reading', lang),
+                  'frames': selector.frames_seen})
+            serial_number, last_info = extract_serial_from_image(BytesIO(selector.take()))
+            if not serial_number:
+                continue
+
+            is_valid, product_name, product_description, match = lookup_serial(serial_number, excel_url)
+            if is_valid:
+                resolved = True
+                audit_verification(serial_number, 'scan', True, match)
+                send({
+                    'type': 'result',
+                    'serial_number': serial_number,
+                    'valid': True,
+                    'message': get_message('success', lang),
+                    'extracted_text': last_info or '',
+                    'product_name': product_name,
+                    'product_description': product_description,
+                    'frames': selector.frames_seen,
+                    'ocr_runs': selector.ocr_runs
+                })
+                return
+            candidates[serial_number] += 1
+            outcomes[serial_number] = match
+
+        # Ran out of time or attempts without a catalog match
+        if candidates:
+            serial_number = candidates.most_common(1)[0][0]
+            send({'type': 'result', 'serial_number': serial_number, 'valid': False,
+                  'message': get_message('not_found', lang), 'extracted_text': last_info or '',
+                  'frames': selector.frames_seen, 'ocr_runs': selector.ocr_runs})
+        else:
+            send({'type': 'error', 'error': get_message('error_ocr', lang),
+                  'extracted_text': last_info or 'Could not process image',
+                  'frames': selector.frames_seen, 'ocr_runs': selector.ocr_runs})
+    except ConnectionClosed:
+        logger.info(f"Scan closed by client after {selector.frames_seen} frames, {selector.ocr_runs} OCR runs")
+    finally:
+        # One audit record per session for its final outcome; misreads from
+        # intermediate OCR attempts and scans cancelled before OCR are not logged
+        if not resolved:
+            if candidates:
+                serial_number = candidates.most_common(1)[0][0]
+                audit_verification(serial_number, 'scan', False, outcomes[serial_number])
+            elif selector.ocr_runs:
+                audit_log.record(None, 'scan', 'ocr_failed')
+
+if SCAN_AVAILABLE:
+    sock.route('/scan_serial')(scan_serial)
+
 if __name__ == '__main__':
     # Use environment variables for host and port if available
     port = int(os.getenv('PORT', 5000))
@@ -462,5 +734,6 @@ if __name__ == '__main__':
     
     logger.info(f"Starting Flask app on port {port}")
     logger.info(f"OCR Available: {OCR_AVAILABLE}")
+    logger.info(f"Live scan available: {SCAN_AVAILABLE}")
     
     app.run(host='0.0.0.0', port=port, debug=debug) 
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Append-only audit log of serial verifications
+
+Requests only put a tuple on a bounded in-process queue; a background thread
+batch-inserts into SQLite (WAL mode) and keeps hourly counts by result and by
+not-found serial up to date, so the summary endpoint reads small aggregate
+tables instead of scanning the log.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ENABLED = os.getenv('AUDIT_ENABLED', 'true').lower() in ('1', 'true', 'yes', 'on')
+AUDIT_DB_PATH = os.getenv('AUDIT_DB_PATH', 'audit_log.db')
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '200'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '1.0'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    serial TEXT,
+    source TEXT NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS audit_hourly (
+    hour INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    result TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (hour, source, result)
+);
+CREATE TABLE IF NOT EXISTS audit_not_found_hourly (
+    hour INTEGER NOT NULL,
+    serial TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (hour, serial)
+);
+CREATE INDEX IF NOT EXISTS idx_not_found_hour ON audit_not_found_hourly (hour);
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA busy_timeout=5000')
+    return conn
+
+
+class AuditLog:
+    """Bounded queue in front of a batching SQLite writer thread"""
+
+    def __init__(self, path=AUDIT_DB_PATH, queue_size=AUDIT_QUEUE_SIZE,
+                 batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL, enabled=AUDIT_ENABLED):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+
+    def record(self, serial, source, result):
+        """Queue one verification; never blocks the request"""
+        if not self.enabled:
+            return
+        self._ensure_writer()
+        try:
+            self.queue.put_nowait((time.time(), serial, source, result))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _ensure_writer(self):
+        # Started lazily (and again after a fork) so pre-forking servers get one writer per worker
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            conn = connect(self.path)
+            conn.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            logger.error(f"Audit log disabled, could not open {self.path}: {str(e)}")
+            self.enabled = False
+            return
+
+        while not self._stop.is_set() or not self.queue.empty():
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(conn, batch)
+            except sqlite3.Error as e:
+                logger.error(f"Audit log write failed, {len(batch)} records lost: {str(e)}")
+                with self._lock:
+                    self.dropped += len(batch)
+        conn.close()
+
+    def _write(self, conn, batch):
+        hourly = {}
+        not_found = {}
+        for ts, serial, source, result in batch:
+            hour = int(ts // 3600) * 3600
+            key = (hour, source, result)
+            hourly[key] = hourly.get(key, 0) + 1
+            if result == 'not_found' and serial:
+                count, first, last = not_found.get((hour, serial), (0, ts, ts))
+                not_found[(hour, serial)] = (count + 1, min(first, ts), max(last, ts))
+
+        with conn:
+            conn.executemany('INSERT INTO audit_log (ts, serial, source, result) VALUES (?, ?, ?, ?)', batch)
+            conn.executemany(
+                'INSERT INTO audit_hourly (hour, source, result, count) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (hour, source, result) DO UPDATE SET count = count + excluded.count',
+                [key + (count,) for key, count in hourly.items()])
+            conn.executemany(
+                'INSERT INTO audit_not_found_hourly (hour, serial, count, first_seen, last_seen) '
+                'VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (hour, serial) DO UPDATE SET count = count + excluded.count, '
+                'last_seen = MAX(last_seen, excluded.last_seen)',
+                [key + values for key, values in not_found.items()])
+
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+
+    def flush(self, timeout=5.0):
+        """Stop the writer after draining the queue (used at exit)"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self.queue.qsize(),
+                'dropped': self.dropped,
+                'written': self.written,
+                'batches': self.batches,
+            }
+
+    def summary(self, hours=24, limit=10):
+        """Counts by source/result and the most repeated not-found serials over the last hours"""
+        since = (int(time.time() // 3600) - hours + 1) * 3600
+        counts = {}
+        total = 0
+        top = []
+        if os.path.exists(self.path):
+            conn = connect(self.path)
+            try:
+                rows = conn.execute(
+                    'SELECT source, result, SUM(count) FROM audit_hourly WHERE hour >= ? '
+                    'GROUP BY source, result', (since,)).fetchall()
+                for source, result, count in rows:
+                    counts.setdefault(source, {})[result] = count
+                    total += count
+                top = [
+                    {'serial': serial, 'count': count, 'first_seen': first, 'last_seen': last}
+                    for serial, count, first, last in conn.execute(
+                        'SELECT serial, SUM(count), MIN(first_seen), MAX(last_seen) '
+                        'FROM audit_not_found_hourly WHERE hour >= ? GROUP BY serial '
+                        'ORDER BY SUM(count) DESC, MAX(last_seen) DESC LIMIT ?', (since, limit))
+                ]
+            except sqlite3.OperationalError:
+                # Writer has not created the tables yet
+                pass
+            finally:
+                conn.close()
+
+        return {
+            'hours': hours,
+            'total': total,
+            'counts': counts,
+            'top_not_found': top,
+            'writer': self.stats(),
+        }
+
+
+audit_log = AuditLog()
+atexit.register(audit_log.flush)
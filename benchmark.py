@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for catalog lookup, OCR and the Flask endpoints
+
+Runs entirely against synthetic data: a generated catalog is served from a
+local HTTP stand-in for EXCEL_URL and label photos are rendered with OpenCV.
+Speed is reported next to serial recall so an optimization that makes
+recognition worse shows up as a regression.
+
+    python benchmark.py                      # run and compare with baseline
+    python benchmark.py --rows 100000        # larger catalog
+    python benchmark.py --save-baseline      # store results as the new baseline
+    python benchmark.py --check              # exit 1 on regression (for CI)
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import pandas as pd
+
+import synthetic_data
+
+# Slowdowns smaller than this are treated as timer noise
+MIN_REGRESSION_MS = 1.0
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+logger = logging.getLogger('benchmark')
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None if it cannot be measured"""
+    try:
+        import resource
+    except ImportError:
+        # Windows: psutil reports the peak working set
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / 1024 / 1024, 1)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def expect_accuracy(results, names):
+    """Declare accuracy metrics this run should produce, so missing ones are flagged"""
+    results['meta'].setdefault('accuracy_expected', []).extend(names)
+
+
+def time_call(func, repeat=5, warmup=1):
+    """Time func() and return (stats in ms, last result)"""
+    result = None
+    for _ in range(warmup):
+        result = func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    stats = {
+        'runs': repeat,
+        'min_ms': round(samples[0], 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+    return stats, result
+
+
+def bench_catalog(results, server, df, repeat):
+    """Catalog parsing from the bytes the app downloads"""
+    import app
+
+    xlsx = server.files['catalog.xlsx'][0]
+    csv = server.files['catalog.csv'][0]
+
+    results['timings']['catalog_load_xlsx'], loaded = time_call(
+        lambda: app.read_excel_file(xlsx), repeat)
+    results['timings']['catalog_load_csv'], _ = time_call(
+        lambda: pd.read_csv(BytesIO(csv)), repeat)
+    results['meta']['catalog_xlsx_bytes'] = len(xlsx)
+    results['meta']['catalog_csv_bytes'] = len(csv)
+
+    if len(loaded) != len(df):
+        logger.warning(f"Catalog round trip lost rows: {len(loaded)} != {len(df)}")
+
+
+def bench_lookup(results, server, df, repeat, samples):
+    """Exact and fuzzy lookups through check_serial_in_excel"""
+    import app
+
+    url = server.url('catalog.xlsx')
+    serials = df[synthetic_data.SERIAL_COLUMN].tolist()
+    step = max(1, len(serials) // samples)
+    queries = serials[::step][:samples]
+    mutated = [synthetic_data.mutate_serial(s, seed=i) for i, s in enumerate(queries)]
+    missing = 'ZZZ' + queries[0]
+
+    results['timings']['lookup_exact'], _ = time_call(
+        lambda: app.check_serial_in_excel(queries[0], url), repeat)
+    results['timings']['lookup_fuzzy'], _ = time_call(
+        lambda: app.check_serial_in_excel(mutated[0], url), repeat)
+    results['timings']['lookup_not_found'], _ = time_call(
+        lambda: app.check_serial_in_excel(missing, url), repeat)
+
+    expect_accuracy(results, ['lookup_exact_recall', 'lookup_fuzzy_recall'])
+    exact_hits = sum(app.check_serial_in_excel(s, url)[0] for s in queries)
+    fuzzy_hits = sum(app.check_serial_in_excel(s, url)[0] for s in mutated)
+    results['accuracy']['lookup_exact_recall'] = round(exact_hits / len(queries), 4)
+    results['accuracy']['lookup_fuzzy_recall'] = round(fuzzy_hits / len(mutated), 4)
+
+
+def bench_ocr(results, serials, widths, conditions, repeat):
+    """Each OCR stage on rendered labels plus serial recall per condition"""
+    import cv2
+    import numpy as np
+    from enhanced_ocr import enhanced_ocr
+
+    engines = []
+    if enhanced_ocr.easyocr_reader:
+        engines.append('easyocr')
+    if enhanced_ocr.tesseract_available:
+        engines.append('tesseract')
+    results['meta']['ocr_engines'] = engines
+    results['meta']['ocr_config'] = {
+        'languages': enhanced_ocr.languages,
+        'allowlist': enhanced_ocr.allowlist,
+        'quantize': enhanced_ocr.quantize,
+    }
+    if 'easyocr' in engines:
+        from enhanced_ocr import EnhancedOCR
+        results['timings']['ocr_model_load'], _ = time_call(EnhancedOCR, repeat=1, warmup=0)
+
+    labels = list(synthetic_data.generate_label_set(serials, widths, conditions))
+    expect_accuracy(results, ['ocr_recall'] + [f"ocr_recall_{c}" for c in conditions]
+                    + [f"ocr_recall_{w}" for w in widths])
+
+    for width in widths:
+        sample = next(l for l in labels if l[1] == width and l[2] == conditions[0])
+        jpeg = sample[3]
+        results['timings'][f"ocr_decode_{width}"], image = time_call(
+            lambda: cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR), repeat)
+        results['timings'][f"ocr_preprocess_{width}"], processed = time_call(
+            lambda: enhanced_ocr.preprocess_image(image), repeat)
+        if 'easyocr' in engines:
+            results['timings'][f"ocr_easyocr_{width}"], _ = time_call(
+                lambda: [enhanced_ocr.extract_text_easyocr(p) for _, p in processed], repeat)
+        if 'tesseract' in engines:
+            results['timings'][f"ocr_tesseract_{width}"], _ = time_call(
+                lambda: [enhanced_ocr.extract_text_tesseract(p) for _, p in processed], repeat)
+        results['timings'][f"ocr_end_to_end_{width}"], _ = time_call(
+            lambda: enhanced_ocr.extract_serial_number(BytesIO(jpeg)), repeat)
+
+    # Adaptive preprocessing: chosen profile versus always running the heavy one
+    profiles = {}
+    for serial, width, condition, jpeg in labels:
+        image = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        enhanced_ocr.preprocess_image(image, record=False)
+        plan = enhanced_ocr.last_plan
+        if plan['profile'] == 'heavy':
+            # Already the heavy path: nothing saved, and a second run only measures noise
+            heavy_ms = plan['elapsed_ms']
+        else:
+            enhanced_ocr.preprocess_image(image, profile='heavy', record=False)
+            heavy_ms = enhanced_ocr.last_plan['elapsed_ms']
+        entry = profiles.setdefault(plan['profile'], {'count': 0, 'ms': 0.0, 'heavy_ms': 0.0})
+        entry['count'] += 1
+        entry['ms'] += plan['elapsed_ms']
+        entry['heavy_ms'] += heavy_ms
+        results['meta'].setdefault('preprocess_profiles', {})[f"{condition}_{width}"] = plan['profile']
+    results['preprocess'] = {
+        name: {
+            'count': e['count'],
+            'avg_ms': round(e['ms'] / e['count'], 3),
+            'saved_ms': round((e['heavy_ms'] - e['ms']) / e['count'], 3),
+        }
+        for name, e in profiles.items()
+    }
+
+    results['timings']['ocr_parse_text'], _ = time_call(
+        lambda: [enhanced_ocr.extract_serial_from_text(f"S/N: {s}") for s in serials], repeat)
+
+    if not engines:
+        logger.warning("No OCR engine available - skipping recognition recall")
+        return
+
+    hits = {}
+    for serial, width, condition, jpeg in labels:
+        found, _ = enhanced_ocr.extract_serial_number(BytesIO(jpeg))
+        key = f"ocr_recall_{condition}"
+        hits.setdefault(key, []).append(found == serial)
+        hits.setdefault(f"ocr_recall_{width}", []).append(found == serial)
+        hits.setdefault('ocr_recall', []).append(found == serial)
+    for key, values in hits.items():
+        results['accuracy'][key] = round(sum(values) / len(values), 4)
+
+
+def bench_endpoints(results, server, df, repeat):
+    """Full request handling through the Flask test client"""
+    import app
+
+    os.environ['EXCEL_URL'] = server.url('catalog.xlsx')
+    client = app.app.test_client()
+    serial = df[synthetic_data.SERIAL_COLUMN].iloc[0]
+    jpeg = synthetic_data.encode_jpeg(synthetic_data.render_label(serial))
+
+    def check():
+        return client.post('/check_serial', data={'serial_number': serial, 'lang': 'en'})
+
+    def upload():
+        return client.post('/upload_serial_image', data={
+            'serial_image': (BytesIO(jpeg), 'label.jpg'),
+            'lang': 'en',
+        }, content_type='multipart/form-data')
+
+    results['timings']['endpoint_check_serial'], response = time_call(check, repeat)
+    if not response.get_json().get('valid'):
+        logger.warning("/check_serial did not find a catalog serial")
+    results['timings']['endpoint_upload_serial_image'], _ = time_call(upload, repeat)
+
+    def api():
+        return client.get(f"/api/serial/{serial}?lang=en", headers={'Accept-Encoding': 'gzip'})
+
+    results['timings']['endpoint_api_serial'], response = time_call(api, repeat)
+    etag = response.headers.get('ETag')
+    if etag:
+        results['timings']['endpoint_api_serial_304'], response = time_call(
+            lambda: client.get(f"/api/serial/{serial}?lang=en", headers={'If-None-Match': etag}), repeat)
+        if response.status_code != 304:
+            logger.warning("/api/serial revalidation did not return 304")
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Return a list of human readable regressions against a stored baseline"""
+    regressions = []
+    for name, stats in results['timings'].items():
+        base = baseline.get('timings', {}).get(name)
+        if not base or not base.get('median_ms'):
+            continue
+        ratio = stats['median_ms'] / base['median_ms']
+        stats['vs_baseline'] = round(ratio, 3)
+        if ratio > 1 + tolerance and stats['median_ms'] - base['median_ms'] > MIN_REGRESSION_MS:
+            regressions.append(f"{name}: {stats['median_ms']:.1f}ms vs {base['median_ms']:.1f}ms ({ratio:.2f}x)")
+    for name, value in results['accuracy'].items():
+        base = baseline.get('accuracy', {}).get(name)
+        if base is not None and value < base:
+            regressions.append(f"{name}: recall {value:.3f} vs {base:.3f}")
+    # A metric the baseline has but this run should have produced and did not
+    # (e.g. the OCR engine failed to load) cannot be shown to be preserved
+    expected = set(results['meta'].get('accuracy_expected', ()))
+    for name, base in baseline.get('accuracy', {}).items():
+        if name in expected and name not in results['accuracy']:
+            regressions.append(f"{name}: not measured (baseline recall {base:.3f})")
+    return regressions
+
+
+def print_report(results, regressions):
+    print(f"Catalog rows: {results['meta']['rows']}  OCR engines: {results['meta'].get('ocr_engines') or 'none'}  "
+          f"max RSS: {results['meta']['max_rss_mb'] or '-'} MB")
+    print("=" * 72)
+    print(f"{'benchmark':<34}{'median ms':>12}{'p95 ms':>12}{'vs base':>12}")
+    for name, stats in results['timings'].items():
+        ratio = stats.get('vs_baseline')
+        print(f"{name:<34}{stats['median_ms']:>12.2f}{stats['p95_ms']:>12.2f}"
+              f"{(f'{ratio:.2f}x' if ratio else '-'):>12}")
+    if results.get('preprocess'):
+        print("=" * 72)
+        print(f"{'preprocess profile':<34}{'images':>12}{'avg ms':>12}{'saved ms':>12}")
+        for name, stats in results['preprocess'].items():
+            print(f"{name:<34}{stats['count']:>12}{stats['avg_ms']:>12.2f}{stats['saved_ms']:>12.2f}")
+    if results['accuracy']:
+        print("=" * 72)
+        for name, value in results['accuracy'].items():
+            print(f"{name:<34}{value:>12.3f}")
+    if regressions:
+        print("=" * 72)
+        print("Regressions:")
+        for line in regressions:
+            print(f"  {line}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000, help='catalog size (10k-1M)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark')
+    parser.add_argument('--samples', type=int, default=5, help='serials used for recall')
+    parser.add_argument('--widths', type=int, nargs='+', default=list(synthetic_data.LABEL_WIDTHS))
+    parser.add_argument('--conditions', nargs='+', default=list(synthetic_data.LABEL_CONDITIONS),
+                        choices=list(synthetic_data.LABEL_CONDITIONS))
+    parser.add_argument('--only', nargs='+', choices=['catalog', 'lookup', 'ocr', 'endpoints'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown ratio')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help='exit 1 on any regression')
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    # Keep benchmark verifications out of the real audit log
+    os.environ.setdefault('AUDIT_DB_PATH', os.path.join(tempfile.gettempdir(), 'benchmark_audit.db'))
+    import app  # noqa: F401  (configures root logging on import)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {
+        'meta': {
+            'rows': args.rows,
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'timings': {},
+        'accuracy': {},
+    }
+    selected = args.only or ['catalog', 'lookup', 'ocr', 'endpoints']
+
+    df = synthetic_data.generate_catalog(args.rows, args.seed)
+    serials = df[synthetic_data.SERIAL_COLUMN].iloc[:args.samples].tolist()
+
+    with synthetic_data.CatalogServer() as server:
+        server.add_catalog(df)
+        if 'catalog' in selected:
+            bench_catalog(results, server, df, args.repeat)
+        if 'lookup' in selected:
+            bench_lookup(results, server, df, args.repeat, args.samples)
+        if 'ocr' in selected:
+            bench_ocr(results, serials, args.widths, args.conditions, args.repeat)
+        if 'endpoints' in selected:
+            bench_endpoints(results, server, df, args.repeat)
+
+    results['meta']['max_rss_mb'] = peak_rss_mb()
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('rows') != args.rows:
+            logger.warning(f"Baseline was recorded with {baseline['meta'].get('rows')} rows")
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+
+    print_report(results, regressions)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Baseline saved to {args.baseline}")
+
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
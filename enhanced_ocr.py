@@ -5,21 +5,63 @@ Enhanced OCR module with multiple engines and advanced image preprocessing
 import cv2
 import numpy as np
 import logging
+import os
+import string
 from PIL import Image, ImageEnhance, ImageFilter
 import re
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Preprocessing profiles, chosen per image by EnhancedOCR.plan_preprocessing
+PREPROCESS_PROFILES = {
+    'fast': {'denoise': None},           # clean, well-lit photos
+    'standard': {'denoise': 'bilateral'},  # moderate noise or low contrast
+    'heavy': {'denoise': 'nlmeans'},     # noisy photos (full NL-means denoising)
+}
+
+# Planner thresholds, measured on the thumbnail
+THUMBNAIL_SIZE = 320
+STANDARD_NOISE = 5.0
+HEAVY_NOISE = 8.0
+MIN_CONTRAST = 60.0
+# Laplacian variance below this means a soft or out-of-focus photo
+MIN_SHARPNESS = 500.0
+# Spread of the background brightness; strong lighting gradients need NL-means
+UNEVEN_LIGHTING = 50.0
+MIN_DESKEW_ANGLE = 2.0
+MAX_DESKEW_ANGLE = 12.0
+
+NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+BACKGROUND_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15))
+
+# EasyOCR recognizer settings. Serials are ASCII, so English-only models with an
+# uppercase/digit allowlist are enough; OCR_QUANTIZE toggles the dynamically
+# int8-quantized CPU recognizer.
+OCR_LANGUAGES = [lang.strip() for lang in os.getenv('OCR_LANGUAGES', 'en').split(',') if lang.strip()]
+OCR_ALLOWLIST = os.getenv('OCR_ALLOWLIST', string.ascii_uppercase + string.digits)
+OCR_QUANTIZE = os.getenv('OCR_QUANTIZE', 'true').lower() in ('1', 'true', 'yes', 'on')
+
 class EnhancedOCR:
-    def __init__(self):
+    def __init__(self, languages=None, allowlist=None, quantize=None):
+        self.languages = languages or OCR_LANGUAGES
+        self.allowlist = OCR_ALLOWLIST if allowlist is None else allowlist
+        self.quantize = OCR_QUANTIZE if quantize is None else quantize
         self.easyocr_reader = None
         self.tesseract_available = False
+        self.profile_stats = {}
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
         
         # Initialize EasyOCR
         try:
             import easyocr
-            self.easyocr_reader = easyocr.Reader(['en', 'ar'], gpu=False)
-            logger.info("EasyOCR initialized successfully")
+            start = time.perf_counter()
+            self.easyocr_reader = easyocr.Reader(self.languages, gpu=False,
+                                                 quantize=self.quantize, verbose=False)
+            logger.info(f"EasyOCR initialized successfully (languages {self.languages}, "
+                        f"quantized {self.quantize}) in {time.perf_counter() - start:.1f}s")
         except Exception as e:
             logger.warning(f"EasyOCR not available: {str(e)}")
         
@@ -36,59 +78,184 @@ class EnhancedOCR:
         except:
             logger.warning("Tesseract OCR not available")
     
-    def preprocess_image(self, image):
-        """Advanced image preprocessing for better OCR results"""
+    def analyze_image(self, gray):
+        """Cheap statistics measured on a thumbnail to plan preprocessing"""
+        height, width = gray.shape[:2]
+        scale = min(1.0, THUMBNAIL_SIZE / max(height, width))
+        # Nearest-neighbour subsampling keeps per-pixel noise and edges intact
+        thumb = gray if scale >= 1.0 else cv2.resize(
+            gray, (max(3, int(width * scale)), max(3, int(height * scale))),
+            interpolation=cv2.INTER_NEAREST)
+
+        # Immerkaer's fast noise estimate
+        residual = cv2.filter2D(thumb.astype(np.float32), -1, NOISE_KERNEL)
+        th, tw = thumb.shape
+        noise = np.sqrt(np.pi / 2) * np.abs(residual[1:-1, 1:-1]).sum() / (6 * (tw - 2) * (th - 2))
+
+        sharpness = cv2.Laplacian(thumb, cv2.CV_32F).var()
+        low, high = np.percentile(thumb, (1, 99))
+
+        # Closing removes dark text, leaving the label background and its lighting
+        background = cv2.blur(cv2.morphologyEx(thumb, cv2.MORPH_CLOSE, BACKGROUND_KERNEL), (31, 31))
+        lighting_low, lighting_high = np.percentile(background, (5, 95))
+
+        threshold, binary = cv2.threshold(thumb, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        # Most pixels are background; dark text sits on a bright background
+        dark_text = np.count_nonzero(binary) >= binary.size / 2
+        if dark_text:
+            binary = cv2.bitwise_not(binary)
+
+        return {
+            'noise': float(noise),
+            'sharpness': float(sharpness),
+            'contrast': float(high - low),
+            'lighting': float(lighting_high - lighting_low),
+            'dark_text': bool(dark_text),
+            'skew': self._estimate_skew(binary),
+        }
+
+    def _estimate_skew(self, text_mask):
+        """Angle (degrees) that makes text rows horizontal, by projection profile"""
+        h, w = text_mask.shape
+        best_angle, best_score = 0.0, -1.0
+        for angle in np.arange(-MAX_DESKEW_ANGLE, MAX_DESKEW_ANGLE + 0.5, 1.0):
+            matrix = cv2.getRotationMatrix2D((w / 2, h / 2), float(angle), 1.0)
+            rotated = cv2.warpAffine(text_mask, matrix, (w, h), flags=cv2.INTER_NEAREST)
+            rows = rotated.sum(axis=1, dtype=np.float32)
+            score = float(np.square(np.diff(rows)).sum())
+            if score > best_score:
+                best_angle, best_score = float(angle), score
+        return best_angle
+
+    def plan_preprocessing(self, stats):
+        """Pick a preprocessing profile from image statistics"""
+        if stats['noise'] >= HEAVY_NOISE or stats['lighting'] >= UNEVEN_LIGHTING:
+            profile = 'heavy'
+        elif stats['noise'] >= STANDARD_NOISE or stats['contrast'] < MIN_CONTRAST:
+            profile = 'standard'
+        else:
+            profile = 'fast'
+
+        return {
+            'profile': profile,
+            'deskew': stats['skew'] if abs(stats['skew']) >= MIN_DESKEW_ANGLE else 0.0,
+            'invert': not stats['dark_text'],
+            'sharpen': stats['sharpness'] < MIN_SHARPNESS,
+        }
+
+    def preprocess_image(self, image, profile=None, record=True):
+        """Adaptive image preprocessing for better OCR results
+
+        The profile (fast/standard/heavy) is planned from cheap statistics unless
+        given explicitly; 'heavy' is the full denoising pipeline. Pass
+        record=False to keep a run out of preprocess_report().
+        """
         try:
+            start = time.perf_counter()
+
             # Convert to numpy array if PIL
             if isinstance(image, Image.Image):
                 image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            
-            original = image.copy()
-            
-            # 1. Resize if too small (OCR works better on larger images)
-            height, width = image.shape[:2]
-            if min(height, width) < 300:
-                scale = 300 / min(height, width)
-                image = cv2.resize(image, (int(width * scale), int(height * scale)), 
-                                 interpolation=cv2.INTER_CUBIC)
-                logger.info(f"Upscaled image from {width}x{height} to {image.shape[1]}x{image.shape[0]}")
-            
-            # 2. Convert to grayscale
+
+            # 1. Convert to grayscale
             if len(image.shape) == 3:
                 gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
             else:
                 gray = image
-            
-            # 3. Noise reduction
-            denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
-            
-            # 4. Contrast enhancement
+
+            # 2. Plan from thumbnail statistics of the original pixels
+            stats = self.analyze_image(gray)
+            plan = self.plan_preprocessing(stats)
+            if profile:
+                plan['profile'] = profile
+
+            # 3. Resize if too small (OCR works better on larger images)
+            height, width = gray.shape[:2]
+            if min(height, width) < 300:
+                scale = 300 / min(height, width)
+                size = (int(width * scale), int(height * scale))
+                gray = cv2.resize(gray, size, interpolation=cv2.INTER_CUBIC)
+                logger.info(f"Upscaled image from {width}x{height} to {gray.shape[1]}x{gray.shape[0]}")
+
+            if plan['deskew']:
+                h, w = gray.shape
+                matrix = cv2.getRotationMatrix2D((w / 2, h / 2), plan['deskew'], 1.0)
+                gray = cv2.warpAffine(gray, matrix, (w, h), flags=cv2.INTER_LINEAR,
+                                      borderMode=cv2.BORDER_REPLICATE)
+
+            if plan['invert']:
+                gray = cv2.bitwise_not(gray)
+
+            # 4. Noise reduction (skipped on clean images)
+            settings = PREPROCESS_PROFILES[plan['profile']]
+            denoised = gray
+            if settings['denoise'] == 'nlmeans':
+                denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
+            elif settings['denoise'] == 'bilateral':
+                denoised = cv2.bilateralFilter(gray, 5, 40, 5)
+
+            # Unsharp mask for soft photos
+            if plan['sharpen']:
+                blurred = cv2.GaussianBlur(denoised, (0, 0), 2.0)
+                denoised = cv2.addWeighted(denoised, 1.8, blurred, -0.8, 0)
+
+            # 5. Contrast enhancement
             clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
             enhanced = clahe.apply(denoised)
-            
-            # 5. Multiple threshold approaches
+
+            # 6. Multiple threshold approaches
             processed_images = []
-            
+
             # Otsu thresholding
             _, otsu = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
             processed_images.append(("otsu", otsu))
-            
+
             # Adaptive thresholding
-            adaptive = cv2.adaptiveThreshold(enhanced, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+            adaptive = cv2.adaptiveThreshold(enhanced, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
                                            cv2.THRESH_BINARY, 11, 2)
             processed_images.append(("adaptive", adaptive))
-            
+
             # Mean thresholding (good for uniform lighting)
             mean_val = np.mean(enhanced)
             _, mean_thresh = cv2.threshold(enhanced, mean_val, 255, cv2.THRESH_BINARY)
             processed_images.append(("mean", mean_thresh))
-            
+
+            elapsed = (time.perf_counter() - start) * 1000
+            if record:
+                self._record_profile(plan['profile'], elapsed)
+            self._local.last_plan = dict(plan, stats=stats, elapsed_ms=elapsed)
+            logger.info(f"Preprocessing profile '{plan['profile']}' (noise {stats['noise']:.1f}, "
+                        f"sharpness {stats['sharpness']:.0f}, contrast {stats['contrast']:.0f}, "
+                        f"deskew {plan['deskew']:.0f}, sharpen {plan['sharpen']}) took {elapsed:.1f}ms")
+
             return processed_images
-            
+
         except Exception as e:
             logger.error(f"Error in image preprocessing: {str(e)}")
             return [("original", image)]
-    
+
+    @property
+    def last_plan(self):
+        """Plan used by the most recent preprocess_image call on this thread"""
+        return getattr(self._local, 'last_plan', None)
+
+    def _record_profile(self, profile, elapsed_ms):
+        with self._stats_lock:
+            entry = self.profile_stats.setdefault(profile, {'count': 0, 'total_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+
+    def preprocess_report(self):
+        """Average preprocessing time per profile and time saved versus 'heavy'"""
+        with self._stats_lock:
+            report = {name: {'count': e['count'], 'avg_ms': round(e['total_ms'] / e['count'], 2)}
+                      for name, e in self.profile_stats.items() if e['count']}
+        heavy = report.get('heavy')
+        if heavy:
+            for entry in report.values():
+                entry['saved_ms'] = round(heavy['avg_ms'] - entry['avg_ms'], 2)
+        return report
+
     def extract_text_easyocr(self, image):
         """Extract text using EasyOCR"""
         if not self.easyocr_reader:
@@ -101,7 +268,8 @@ class EnhancedOCR:
             else:
                 rgb_image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
             
-            results = self.easyocr_reader.readtext(rgb_image, detail=0)
+            results = self.easyocr_reader.readtext(rgb_image, detail=0,
+                                                   allowlist=self.allowlist or None)
             text = ' '.join(results) if results else ''
             
             if text.strip():
@@ -0,0 +1,110 @@
+"""
+Cheap frame scoring and best-frame selection for continuous camera scanning
+
+Frames arrive at a low rate over one connection. Each is scored on a small
+grayscale copy (sharpness and text-line presence) and only the best recent
+frame is handed to the full OCR pipeline.
+"""
+
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCORE_WIDTH = 320
+MIN_SHARPNESS = float(os.getenv('SCAN_MIN_SHARPNESS', '150'))
+# A frame must beat the last OCR'd frame by this factor to be OCR'd right away,
+# otherwise OCR runs at most once per cooldown
+SCORE_MARGIN = 1.15
+OCR_COOLDOWN = float(os.getenv('SCAN_OCR_COOLDOWN', '1.0'))
+MAX_OCR_ATTEMPTS = int(os.getenv('SCAN_MAX_OCR_ATTEMPTS', '6'))
+SCAN_TIMEOUT = float(os.getenv('SCAN_TIMEOUT', '30'))
+
+TEXT_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (9, 3))
+GRADIENT_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+
+def decode_frame(data):
+    """Decode JPEG/PNG bytes into a BGR image (None if unreadable)"""
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def score_frame(image):
+    """Score a frame by sharpness and text-line presence; 0 means not worth OCR"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    height, width = gray.shape[:2]
+    if width > SCORE_WIDTH:
+        gray = cv2.resize(gray, (SCORE_WIDTH, max(1, int(height * SCORE_WIDTH / width))),
+                          interpolation=cv2.INTER_AREA)
+
+    # Median first so sensor noise does not read as detail
+    sharpness = float(cv2.Laplacian(cv2.medianBlur(gray, 3), cv2.CV_32F).var())
+
+    # Text lines show up as wide blobs of strong gradient once characters are merged
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, GRADIENT_KERNEL)
+    _, mask = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, TEXT_KERNEL)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    frame_w = gray.shape[1]
+    text_lines = 0
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w >= frame_w * 0.2 and 2.5 * h <= w and h >= 4:
+            text_lines += 1
+
+    score = 0.0
+    if sharpness >= MIN_SHARPNESS and text_lines:
+        score = sharpness * min(text_lines, 3)
+
+    return {'score': score, 'sharpness': sharpness, 'text_lines': text_lines}
+
+
+class FrameSelector:
+    """Keeps the best frame seen since the last OCR run and decides when to OCR"""
+
+    def __init__(self, cooldown=OCR_COOLDOWN, margin=SCORE_MARGIN, max_attempts=MAX_OCR_ATTEMPTS):
+        self.cooldown = cooldown
+        self.margin = margin
+        self.max_attempts = max_attempts
+        self.candidate = None
+        self.candidate_score = 0.0
+        self.last_ocr_score = 0.0
+        self.last_ocr_time = None
+        self.frames_seen = 0
+        self.ocr_runs = 0
+
+    def offer(self, frame, score):
+        """Remember the frame if it is the best one since the last OCR run"""
+        self.frames_seen += 1
+        if score > self.candidate_score:
+            self.candidate, self.candidate_score = frame, score
+
+    def should_run(self, now=None):
+        now = time.monotonic() if now is None else now
+        if self.candidate is None or self.ocr_runs >= self.max_attempts:
+            return False
+        if self.last_ocr_time is None:
+            return True
+        if self.candidate_score >= self.last_ocr_score * self.margin:
+            return True
+        return now - self.last_ocr_time >= self.cooldown
+
+    def take(self, now=None):
+        """Hand the candidate frame to OCR and reset the window"""
+        frame = self.candidate
+        self.last_ocr_score = self.candidate_score
+        self.last_ocr_time = time.monotonic() if now is None else now
+        self.ocr_runs += 1
+        self.candidate, self.candidate_score = None, 0.0
+        return frame
+
+    @property
+    def exhausted(self):
+        return self.ocr_runs >= self.max_attempts
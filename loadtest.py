@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Load-test harness reporting throughput, tail latency and resource usage
+
+Starts the app locally against a stubbed catalog server (see synthetic_data.py),
+drives the verification endpoints with a configurable concurrency and request
+mix, and writes machine-readable results that can be compared across commits.
+
+    python loadtest.py --duration 30 --concurrency 8
+    python loadtest.py --mix check_serial=9,upload_serial_image=1 --output run.json
+    python loadtest.py --server gunicorn --workers 4 --compare previous.json
+    python loadtest.py --url http://localhost:5000 --pid 1234 --serials serials.txt
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import synthetic_data
+
+logger = logging.getLogger('loadtest')
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Endpoint name -> builder(session, base_url, payloads) returning a response.
+# New (e.g. bulk) endpoints are added here and become selectable in --mix.
+ENDPOINTS = {}
+
+
+def endpoint(name):
+    def register(func):
+        ENDPOINTS[name] = func
+        return func
+    return register
+
+
+@endpoint('check_serial')
+def request_check_serial(session, base_url, payloads):
+    serial = random.choice(payloads['serials'])
+    return session.post(f"{base_url}/check_serial", data={'serial_number': serial, 'lang': 'en'}, timeout=120)
+
+
+@endpoint('upload_serial_image')
+def request_upload_serial_image(session, base_url, payloads):
+    jpeg = random.choice(payloads['labels'])
+    return session.post(f"{base_url}/upload_serial_image",
+                        files={'serial_image': ('label.jpg', jpeg, 'image/jpeg')},
+                        data={'lang': 'en'}, timeout=120)
+
+
+@endpoint('api_serial')
+def request_api_serial(session, base_url, payloads):
+    serial = random.choice(payloads['serials'])
+    return session.get(f"{base_url}/api/serial/{serial}", params={'lang': 'en'}, timeout=120)
+
+
+@endpoint('health')
+def request_health(session, base_url, payloads):
+    return session.get(f"{base_url}/health", timeout=30)
+
+
+def parse_mix(value):
+    """Parse 'check_serial=8,upload_serial_image=2' into {name: weight}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}'. Choose from: {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight) if weight else 1.0
+    return mix
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+def latency_summary(samples, elapsed):
+    """Throughput and latency; 5xx/connection failures and 4xx are counted apart
+
+    A 4xx is a handled rejection (e.g. /upload_serial_image answers 400 when OCR
+    finds no serial), so client_error_rate is where broken recognition shows up.
+    """
+    latencies = [s['ms'] for s in samples]
+    errors = sum(1 for s in samples if s['status'] is None or s['status'] >= 500)
+    client_errors = sum(1 for s in samples if s['status'] is not None and 400 <= s['status'] < 500)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'client_errors': client_errors,
+        'client_error_rate': round(client_errors / len(samples), 4) if samples else 0.0,
+        'rps': round(len(samples) / elapsed, 3) if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': round(max(latencies), 3) if latencies else None,
+    }
+
+
+class ResourceSampler:
+    """Samples CPU and RSS of the server process tree once per interval"""
+
+    def __init__(self, pid, interval):
+        self.interval = interval
+        self.timeline = []
+        self.completed = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.process = None
+        try:
+            import psutil
+            self.process = psutil.Process(pid) if pid else None
+        except ImportError:
+            logger.warning("psutil not installed - CPU/RSS sampling disabled")
+
+    def _tree(self):
+        try:
+            return [self.process] + self.process.children(recursive=True)
+        except Exception:
+            return [self.process]
+
+    def _run(self):
+        start = time.perf_counter()
+        last_completed = 0
+        if self.process:
+            for proc in self._tree():
+                proc.cpu_percent(None)
+        while not self._stop.wait(self.interval):
+            point = {'t': round(time.perf_counter() - start, 2)}
+            done = self.completed
+            point['rps'] = round((done - last_completed) / self.interval, 2)
+            last_completed = done
+            if self.process:
+                cpu, rss = 0.0, 0
+                for proc in self._tree():
+                    try:
+                        cpu += proc.cpu_percent(None)
+                        rss += proc.memory_info().rss
+                    except Exception:
+                        continue
+                point['cpu_percent'] = round(cpu, 1)
+                point['rss_mb'] = round(rss / 1024 / 1024, 1)
+            self.timeline.append(point)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+def start_app(args, excel_url):
+    """Start the app in a subprocess and wait until /health answers"""
+    env = dict(os.environ, EXCEL_URL=excel_url, PORT=str(args.port), FLASK_ENV='production')
+    env.setdefault('AUDIT_DB_PATH', os.path.join(tempfile.gettempdir(), 'loadtest_audit.db'))
+    if args.server == 'gunicorn':
+        command = ['gunicorn', '-w', str(args.workers), '--threads', str(args.threads),
+                   '-b', f"127.0.0.1:{args.port}", 'app:app']
+    else:
+        command = [sys.executable, 'app.py']
+    process = subprocess.Popen(command, cwd=APP_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited during startup with code {process.returncode}")
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("App did not become healthy in time")
+
+
+def read_serials(path):
+    """Serials from a text file, one per line ('#' starts a comment)"""
+    with open(path, encoding='utf-8') as f:
+        serials = [line.split('#', 1)[0].strip() for line in f]
+    serials = [s for s in serials if s]
+    if not serials:
+        raise SystemExit(f"No serials in {path}")
+    return serials
+
+
+def build_payloads(args, df):
+    """Serials (found, fuzzy and unknown) and label photos used by the mix
+
+    Serials come from --serials when given (they should be in the target's
+    catalog), otherwise from the synthetic catalog.
+    """
+    serials = read_serials(args.serials) if args.serials else df[synthetic_data.SERIAL_COLUMN].tolist()
+    rng = random.Random(args.seed)
+    found = rng.sample(serials, min(50, len(serials)))
+    fuzzy = [synthetic_data.mutate_serial(s, seed=i) for i, s in enumerate(found[:10])]
+    unknown = ['999ZZZZ' + str(10000 + i) for i in range(10)]
+    labels = [jpeg for _, _, _, jpeg in synthetic_data.generate_label_set(
+        found[:5], widths=(640,), conditions=['clean', 'hard'])]
+    return {'serials': found + fuzzy + unknown, 'labels': labels}
+
+
+def run_load(base_url, mix, payloads, args, sampler):
+    """Drive the mix for args.duration seconds; return per-request samples"""
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples = []
+    lock = threading.Lock()
+    local = threading.local()
+    deadline = time.perf_counter() + args.duration
+
+    def worker(worker_id):
+        local.session = requests.Session()
+        chooser = random.Random(args.seed + worker_id)
+        while time.perf_counter() < deadline:
+            name = chooser.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = ENDPOINTS[name](local.session, base_url, payloads).status_code
+            except requests.RequestException:
+                status = None
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                samples.append({'endpoint': name, 'ms': elapsed, 'status': status})
+                sampler.completed += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in [pool.submit(worker, i) for i in range(args.concurrency)]:
+            future.result()
+    return samples, time.perf_counter() - start
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(results, previous):
+    """Print the change of headline numbers against an earlier run"""
+    print("Comparison with previous run:")
+    rows = [('summary', results['summary'], previous.get('summary', {}))]
+    rows += [(name, stats, previous.get('endpoints', {}).get(name, {}))
+             for name, stats in results['endpoints'].items()]
+    for label, now, before in rows:
+        for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'error_rate', 'client_error_rate'):
+            if now.get(key) is None or before.get(key) is None:
+                continue
+            if before[key]:
+                change = f"{(now[key] - before[key]) / before[key] * 100:+.1f}%"
+            else:
+                change = 'new' if now[key] else 'same'
+            print(f"  {label:<22}{key:<18}{before[key]:>12.2f} -> {now[key]:>12.2f} ({change})")
+
+
+def print_report(results):
+    meta = results['meta']
+    print(f"Commit {meta['commit']}  server={meta['server']}  concurrency={meta['concurrency']}  "
+          f"duration={meta['duration']}s")
+    print("=" * 88)
+    print(f"{'endpoint':<22}{'requests':>10}{'rps':>10}{'errors':>8}{'4xx':>6}"
+          f"{'p50 ms':>10}{'p95 ms':>11}{'p99 ms':>11}")
+    for name, stats in list(results['endpoints'].items()) + [('TOTAL', results['summary'])]:
+        print(f"{name:<22}{stats['requests']:>10}{stats['rps']:>10.2f}{stats['errors']:>8}"
+              f"{stats['client_errors']:>6}{stats['p50_ms'] or 0:>10.1f}"
+              f"{stats['p95_ms'] or 0:>11.1f}{stats['p99_ms'] or 0:>11.1f}")
+    resources = results.get('resources')
+    if resources:
+        print("=" * 88)
+        print(f"CPU avg {resources['cpu_percent_avg']}%  max {resources['cpu_percent_max']}%  "
+              f"RSS max {resources['rss_mb_max']} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--concurrency', type=int, default=4, help='parallel clients')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('check_serial=8,upload_serial_image=2'),
+                        help=f"weighted endpoints, e.g. check_serial=8,upload_serial_image=2 ({', '.join(ENDPOINTS)})")
+    parser.add_argument('--rows', type=int, default=10000, help='stub catalog size')
+    parser.add_argument('--server', choices=['flask', 'gunicorn'], default='flask')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--url', help='target an already running instance instead of starting one')
+    parser.add_argument('--pid', type=int, help='server pid to sample when using --url')
+    parser.add_argument('--serials', help="file of serials from the target's catalog, one per line "
+                                          "(needed with --url, where the synthetic catalog is not loaded)")
+    parser.add_argument('--interval', type=float, default=1.0, help='resource sampling interval')
+    parser.add_argument('--startup-timeout', type=float, default=120)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this path')
+    parser.add_argument('--compare', help='previous JSON results to compare with')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s:%(message)s')
+    if args.url and not args.serials:
+        logger.warning("--url without --serials: requests use synthetic serials that the target's "
+                       "catalog does not contain, so lookups measure the not-found path")
+
+    df = synthetic_data.generate_catalog(args.rows, args.seed)
+    payloads = build_payloads(args, df)
+
+    process = None
+    with synthetic_data.CatalogServer() as catalog:
+        catalog.add_catalog(df)
+        if args.url:
+            base_url, pid = args.url.rstrip('/'), args.pid
+        else:
+            logger.info(f"Starting {args.server} app on port {args.port}")
+            process, base_url = start_app(args, catalog.url('catalog.xlsx'))
+            pid = process.pid
+
+        sampler = ResourceSampler(pid, args.interval)
+        sampler.start()
+        try:
+            logger.info(f"Running {args.duration}s of load with {args.concurrency} clients")
+            samples, elapsed = run_load(base_url, args.mix, payloads, args, sampler)
+        finally:
+            sampler.stop()
+            if process:
+                process.terminate()
+                process.wait(timeout=10)
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'server': 'external' if args.url else args.server,
+            # Unknown for an external instance
+            'workers': None if args.url else (args.workers if args.server == 'gunicorn' else 1),
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'mix': args.mix,
+            'rows': args.rows,
+            'serials': args.serials or 'synthetic',
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'summary': latency_summary(samples, elapsed),
+        'endpoints': {
+            name: latency_summary([s for s in samples if s['endpoint'] == name], elapsed)
+            for name in args.mix
+        },
+        'status_codes': {},
+        'timeline': sampler.timeline,
+    }
+    for s in samples:
+        key = str(s['status'])
+        results['status_codes'][key] = results['status_codes'].get(key, 0) + 1
+
+    cpu = [p['cpu_percent'] for p in sampler.timeline if 'cpu_percent' in p]
+    rss = [p['rss_mb'] for p in sampler.timeline if 'rss_mb' in p]
+    if cpu:
+        results['resources'] = {
+            'cpu_percent_avg': round(sum(cpu) / len(cpu), 1),
+            'cpu_percent_max': max(cpu),
+            'rss_mb_max': max(rss),
+        }
+
+    print_report(results)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Results written to {args.output}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,6 +8,10 @@ class EnhancedCamera {
         this.video = null;
         this.canvas = null;
         this.isStreaming = false;
+        this.scanSocket = null;
+        this.scanTimer = null;
+        this.scanFrameWidth = 640;     // frames are downscaled before sending
+        this.scanIntervalMs = 350;     // ~3 frames per second
         this.constraints = {
             video: {
                 facingMode: 'environment', // Use back camera on mobile
@@ -70,6 +74,11 @@ class EnhancedCamera {
                                     <span class="lang-en">Capture</span>
                                     <span class="lang-ar" style="display: none;">التقاط</span>
                                 </button>
+                                <button id="scanBtn" class="btn btn-success btn-lg me-2">
+                                    <i class="bi bi-upc-scan"></i>
+                                    <span class="lang-en">Live Scan</span>
+                                    <span class="lang-ar" style="display: none;">مسح مباشر</span>
+                                </button>
                                 <button id="switchCameraBtn" class="btn btn-secondary me-2">
                                     <i class="bi bi-arrow-repeat"></i>
                                     <span class="lang-en">Flip</span>
@@ -134,7 +143,10 @@ class EnhancedCamera {
         const retakeBtn = document.getElementById('retakeBtn');
         const useCapturedBtn = document.getElementById('useCapturedBtn');
 
+        const scanBtn = document.getElementById('scanBtn');
+
         captureBtn?.addEventListener('click', () => this.captureImage());
+        scanBtn?.addEventListener('click', () => this.toggleLiveScan());
         switchCameraBtn?.addEventListener('click', () => this.switchCamera());
         retakeBtn?.addEventListener('click', () => this.retake());
         useCapturedBtn?.addEventListener('click', () => this.useCapturedImage());
@@ -170,6 +182,7 @@ class EnhancedCamera {
     }
 
     stopCamera() {
+        this.stopLiveScan();
         if (this.stream) {
             this.stream.getTracks().forEach(track => track.stop());
             this.stream = null;
@@ -202,6 +215,88 @@ class EnhancedCamera {
         }, 'image/jpeg', 0.9);
     }
 
+    toggleLiveScan() {
+        if (this.scanSocket) {
+            this.stopLiveScan();
+            this.hideStatus();
+        } else {
+            this.startLiveScan();
+        }
+    }
+
+    startLiveScan() {
+        if (!this.isStreaming || !window.WebSocket) return;
+
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const socket = new WebSocket(`${protocol}//${window.location.host}/scan_serial?lang=${currentLanguage}`);
+        socket.binaryType = 'arraybuffer';
+        this.scanSocket = socket;
+        let finished = false;
+
+        this.showStatus('Scanning... point the camera at the serial number',
+                        'جارٍ المسح... وجّه الكاميرا نحو الرقم التسلسلي');
+        document.getElementById('scanBtn')?.classList.replace('btn-success', 'btn-danger');
+
+        socket.addEventListener('open', () => {
+            this.scanTimer = setInterval(() => this.sendScanFrame(), this.scanIntervalMs);
+        });
+
+        socket.addEventListener('message', (event) => {
+            const data = JSON.parse(event.data);
+            if (data.type === 'status') {
+                this.showStatus(data.message, data.message);
+                return;
+            }
+            finished = true;
+            this.stopLiveScan();
+            bootstrap.Modal.getInstance(this.modal)?.hide();
+            this.displayUploadResult(data, data.type === 'result');
+        });
+
+        socket.addEventListener('close', () => {
+            if (finished || this.scanSocket !== socket) return;
+            // Server without scan support or dropped connection: fall back to a single capture
+            this.stopLiveScan();
+            this.showStatus('Live scan unavailable. Use Capture instead.',
+                            'المسح المباشر غير متاح. استخدم الالتقاط بدلاً من ذلك.');
+        });
+    }
+
+    sendScanFrame() {
+        const socket = this.scanSocket;
+        if (!socket || socket.readyState !== WebSocket.OPEN || !this.isStreaming) return;
+        // Skip a tick rather than queueing frames behind a slow connection
+        if (socket.bufferedAmount > 0) return;
+
+        const scale = Math.min(1, this.scanFrameWidth / this.video.videoWidth);
+        const frameCanvas = this.scanCanvas || (this.scanCanvas = document.createElement('canvas'));
+        frameCanvas.width = Math.round(this.video.videoWidth * scale);
+        frameCanvas.height = Math.round(this.video.videoHeight * scale);
+        frameCanvas.getContext('2d').drawImage(this.video, 0, 0, frameCanvas.width, frameCanvas.height);
+
+        frameCanvas.toBlob((blob) => {
+            if (blob && socket.readyState === WebSocket.OPEN) {
+                socket.send(blob);
+            }
+        }, 'image/jpeg', 0.7);
+    }
+
+    stopLiveScan() {
+        if (this.scanTimer) {
+            clearInterval(this.scanTimer);
+            this.scanTimer = null;
+        }
+        if (this.scanSocket) {
+            const socket = this.scanSocket;
+            this.scanSocket = null;
+            if (socket.readyState === WebSocket.OPEN) {
+                socket.send('stop');
+            }
+            socket.close();
+        }
+        document.getElementById('scanBtn')?.classList.replace('btn-danger', 'btn-success');
+    }
+
     displayCapturedImage(imageUrl, blob) {
         const capturedImage = document.getElementById('capturedImage');
         const container = document.getElementById('capturedImageContainer');
@@ -255,57 +350,7 @@ class EnhancedCamera {
             });
 
             const data = await response.json();
-            
-            if (response.ok) {
-                let extraInfo = null;
-                if (data.serial_number) {
-                    extraInfo = currentLanguage === 'en' ? 
-                        `✓ Extracted serial number: ${data.serial_number}` : 
-                        `✓ الرقم التسلسلي المستخرج: ${data.serial_number}`;
-                        
-                    if (data.extracted_text) {
-                        extraInfo += currentLanguage === 'en' ? 
-                            `\nExtracted text: ${data.extracted_text}` : 
-                            `\nالنص المستخرج: ${data.extracted_text}`;
-                    }
-                }
-                
-                // Format product information for display
-                let productInfo = null;
-                if (data.valid) {
-                    productInfo = {
-                        serial: data.serial_number,
-                        name: data.product_name || 'N/A',
-                        description: data.product_description || 'N/A'
-                    };
-                    
-                    // Add product details to extra info
-                    if (data.product_name || data.product_description) {
-                        const productDetails = currentLanguage === 'en' ? 
-                            `\n📋 Product Details:\n• Name: ${data.product_name || 'N/A'}\n• Code: ${data.product_description || 'N/A'}` :
-                            `\n📋 تفاصيل المنتج:\n• الاسم: ${data.product_name || 'غير متوفر'}\n• الكود: ${data.product_description || 'غير متوفر'}`;
-                        extraInfo = (extraInfo || '') + productDetails;
-                    }
-                }
-                
-                showResult(data.message, data.valid, extraInfo, productInfo);
-            } else {
-                let errorMsg = data.error || 'Processing failed';
-                let extraInfo = null;
-                
-                if (data.extracted_text) {
-                    extraInfo = currentLanguage === 'en' ? 
-                        `Extracted text: ${data.extracted_text}\n\n⚠️ Could not identify a valid serial number from this text.\nTip: Try entering the serial number manually for best results.` : 
-                        `النص المستخرج: ${data.extracted_text}\n\n⚠️ لم نتمكن من تحديد رقم تسلسلي صالح من هذا النص.\nنصيحة: جرب إدخال الرقم التسلسلي يدوياً للحصول على أفضل النتائج.`;
-                } else {
-                    // Provide helpful guidance when OCR fails completely
-                    extraInfo = currentLanguage === 'en' ? 
-                        `💡 Camera capture tips:\n• Ensure good lighting\n• Hold camera steady\n• Position serial number clearly in frame\n• For best results, enter the serial number manually above` : 
-                        `💡 نصائح التصوير:\n• تأكد من الإضاءة الجيدة\n• امسك الكاميرا بثبات\n• ضع الرقم التسلسلي بوضوح في الإطار\n• للحصول على أفضل النتائج، أدخل الرقم التسلسلي يدوياً أعلاه`;
-                }
-                
-                showResult(errorMsg, false, extraInfo);
-            }
+            this.displayUploadResult(data, response.ok);
         } catch (error) {
             console.error('Error uploading image:', error);
             const errorMsg = currentLanguage === 'en' ? 
@@ -322,6 +367,59 @@ class EnhancedCamera {
         }
     }
 
+    displayUploadResult(data, ok) {
+        if (ok) {
+            let extraInfo = null;
+            if (data.serial_number) {
+                extraInfo = currentLanguage === 'en' ? 
+                    `✓ Extracted serial number: ${data.serial_number}` : 
+                    `✓ الرقم التسلسلي المستخرج: ${data.serial_number}`;
+                    
+                if (data.extracted_text) {
+                    extraInfo += currentLanguage === 'en' ? 
+                        `\nExtracted text: ${data.extracted_text}` : 
+                        `\nالنص المستخرج: ${data.extracted_text}`;
+                }
+            }
+            
+            // Format product information for display
+            let productInfo = null;
+            if (data.valid) {
+                productInfo = {
+                    serial: data.serial_number,
+                    name: data.product_name || 'N/A',
+                    description: data.product_description || 'N/A'
+                };
+                
+                // Add product details to extra info
+                if (data.product_name || data.product_description) {
+                    const productDetails = currentLanguage === 'en' ? 
+                        `\n📋 Product Details:\n• Name: ${data.product_name || 'N/A'}\n• Code: ${data.product_description || 'N/A'}` :
+                        `\n📋 تفاصيل المنتج:\n• الاسم: ${data.product_name || 'غير متوفر'}\n• الكود: ${data.product_description || 'غير متوفر'}`;
+                    extraInfo = (extraInfo || '') + productDetails;
+                }
+            }
+            
+            showResult(data.message, data.valid, extraInfo, productInfo);
+        } else {
+            let errorMsg = data.error || 'Processing failed';
+            let extraInfo = null;
+            
+            if (data.extracted_text) {
+                extraInfo = currentLanguage === 'en' ? 
+                    `Extracted text: ${data.extracted_text}\n\n⚠️ Could not identify a valid serial number from this text.\nTip: Try entering the serial number manually for best results.` : 
+                    `النص المستخرج: ${data.extracted_text}\n\n⚠️ لم نتمكن من تحديد رقم تسلسلي صالح من هذا النص.\nنصيحة: جرب إدخال الرقم التسلسلي يدوياً للحصول على أفضل النتائج.`;
+            } else {
+                // Provide helpful guidance when OCR fails completely
+                extraInfo = currentLanguage === 'en' ? 
+                    `💡 Camera capture tips:\n• Ensure good lighting\n• Hold camera steady\n• Position serial number clearly in frame\n• For best results, enter the serial number manually above` : 
+                    `💡 نصائح التصوير:\n• تأكد من الإضاءة الجيدة\n• امسك الكاميرا بثبات\n• ضع الرقم التسلسلي بوضوح في الإطار\n• للحصول على أفضل النتائج، أدخل الرقم التسلسلي يدوياً أعلاه`;
+            }
+            
+            showResult(errorMsg, false, extraInfo);
+        }
+    }
+
     resetUI() {
         const elements = [
             'capturedImageContainer',
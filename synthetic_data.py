@@ -0,0 +1,231 @@
+"""
+Synthetic catalogs and label images for offline benchmarking
+
+Everything here is deterministic for a given seed so benchmark runs can be
+compared across commits without network access or real customer data.
+"""
+
+import csv
+import io
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Column names as they appear in the production sheet
+SERIAL_COLUMN = 'SerialNumber'
+NAME_COLUMN = 'اسم المادة'
+CODE_COLUMN = 'رمز المادة'
+
+# Factory/line codes used in LG serials (e.g. 505KRWZ35633)
+PLANT_CODES = ['KRWZ', 'KRWK', 'KRWP', 'MXRW', 'INHN', 'PLMW', 'VNHP', 'CNTJ',
+               'IDTA', 'EGYC', 'RMXG', 'KWPW']
+
+PRODUCTS = [
+    ('مكيف ابيض 2 طن (داخلية)', 'S4NW24K23WE.EC6GJOR'),
+    ('حلاجة فضية وبراد-ماء', 'DFC513FV.APYPMEA'),
+    ('غسالة اوتوماتيك 9 كغ', 'F4R5VYG0W.ABWPMEA'),
+    ('شاشة OLED 55 انش', 'OLED55C36LC.AMCE'),
+    ('شاشة UHD 65 انش', '65UR78006LK.AMCE'),
+    ('فرن ميكروويف 42 ليتر', 'MH8265DIS.BBKQMEA'),
+    ('مكيف سبليت 1.5 طن', 'S4NQ18KL3WE.EC6GJOR'),
+    ('جلاية صحون فضية', 'DFB512FP.APZPMEA'),
+]
+
+# Named label conditions: blur kernel, skew degrees, noise sigma, lighting gradient
+LABEL_CONDITIONS = {
+    'clean': {'blur': 0, 'skew': 0.0, 'noise': 0.0, 'gradient': 0.0},
+    'blurred': {'blur': 5, 'skew': 0.0, 'noise': 0.0, 'gradient': 0.0},
+    'skewed': {'blur': 0, 'skew': 7.0, 'noise': 0.0, 'gradient': 0.0},
+    'noisy': {'blur': 0, 'skew': 0.0, 'noise': 18.0, 'gradient': 0.0},
+    'dim': {'blur': 0, 'skew': 0.0, 'noise': 0.0, 'gradient': 0.6},
+    'hard': {'blur': 3, 'skew': 4.0, 'noise': 12.0, 'gradient': 0.4},
+}
+
+LABEL_WIDTHS = (320, 640, 1280)
+
+
+def generate_serials(count, seed=0):
+    """Generate unique LG-style serial numbers (year digit, month, plant, sequence)"""
+    capacity = len(PLANT_CODES) * 100000 * 120
+    if count > capacity:
+        raise ValueError(f"Cannot generate more than {capacity} unique serials")
+
+    rng = np.random.default_rng(seed)
+    # Spread unique indices over the serial fields
+    indices = rng.choice(capacity, size=count, replace=False)
+
+    plants = np.array(PLANT_CODES)[indices % len(PLANT_CODES)]
+    rest = indices // len(PLANT_CODES)
+    sequence = rest % 100000
+    rest //= 100000
+    month = rest % 12 + 1
+    year = rest // 12
+
+    return [f"{y}{m:02d}{p}{s:05d}" for y, m, p, s in zip(year, month, plants, sequence)]
+
+
+def generate_catalog(rows, seed=0):
+    """Build a catalog DataFrame shaped like the production Excel sheet"""
+    rng = np.random.default_rng(seed + 1)
+    product_idx = rng.integers(0, len(PRODUCTS), size=rows)
+    return pd.DataFrame({
+        SERIAL_COLUMN: generate_serials(rows, seed),
+        NAME_COLUMN: [PRODUCTS[i][0] for i in product_idx],
+        CODE_COLUMN: [PRODUCTS[i][1] for i in product_idx],
+    })
+
+
+def catalog_to_xlsx(df):
+    """Serialize a catalog to xlsx bytes"""
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False, engine='openpyxl')
+    return buffer.getvalue()
+
+
+def catalog_to_csv(df):
+    """Serialize a catalog to UTF-8 csv bytes"""
+    return df.to_csv(index=False, quoting=csv.QUOTE_MINIMAL).encode('utf-8')
+
+
+def mutate_serial(serial, seed=0):
+    """Introduce a single OCR-like character substitution into a serial"""
+    confusions = {'0': 'O', '1': 'I', '5': 'S', '8': 'B', 'Z': '2', 'O': '0', 'I': '1'}
+    rng = np.random.default_rng(seed)
+    chars = list(serial)
+    candidates = [i for i, c in enumerate(chars) if c in confusions] or list(range(len(chars)))
+    pos = candidates[rng.integers(0, len(candidates))]
+    chars[pos] = confusions.get(chars[pos], 'X' if chars[pos] != 'X' else 'Y')
+    return ''.join(chars)
+
+
+def render_label(serial, width=640, blur=0, skew=0.0, noise=0.0, gradient=0.0, seed=0):
+    """Render a product label photo containing the serial as a BGR image"""
+    rng = np.random.default_rng(seed)
+    height = int(width * 0.45)
+    image = np.full((height, width, 3), 235, dtype=np.uint8)
+
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    scale = width / 420.0
+    thickness = max(1, int(round(width / 320.0)))
+    margin = int(width * 0.06)
+
+    cv2.putText(image, 'LG Electronics', (margin, int(height * 0.22)), font,
+                scale * 0.6, (40, 40, 40), thickness, cv2.LINE_AA)
+    cv2.putText(image, 'S/N:', (margin, int(height * 0.55)), font,
+                scale * 0.6, (20, 20, 20), thickness, cv2.LINE_AA)
+    (label_w, _), _ = cv2.getTextSize('S/N: ', font, scale * 0.6, thickness)
+    cv2.putText(image, serial, (margin + label_w, int(height * 0.55)), font,
+                scale, (10, 10, 10), thickness + 1, cv2.LINE_AA)
+    cv2.putText(image, 'MADE IN KOREA', (margin, int(height * 0.85)), font,
+                scale * 0.45, (60, 60, 60), thickness, cv2.LINE_AA)
+
+    if skew:
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), skew, 1.0)
+        image = cv2.warpAffine(image, matrix, (width, height),
+                               borderMode=cv2.BORDER_CONSTANT, borderValue=(200, 200, 200))
+
+    if gradient:
+        # Left-to-right falloff as if lit from one side
+        ramp = np.linspace(1.0, 1.0 - gradient, width, dtype=np.float32)
+        image = (image.astype(np.float32) * ramp[None, :, None]).astype(np.uint8)
+
+    if blur:
+        kernel = blur if blur % 2 else blur + 1
+        image = cv2.GaussianBlur(image, (kernel, kernel), 0)
+
+    if noise:
+        grain = rng.normal(0, noise, image.shape).astype(np.float32)
+        image = np.clip(image.astype(np.float32) + grain, 0, 255).astype(np.uint8)
+
+    return image
+
+
+def encode_jpeg(image, quality=90):
+    """Encode a BGR image as JPEG bytes, as a phone upload would arrive"""
+    ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode image")
+    return buffer.tobytes()
+
+
+def generate_label_set(serials, widths=LABEL_WIDTHS, conditions=None, seed=0):
+    """Yield (serial, width, condition, jpeg_bytes) for every combination"""
+    conditions = conditions or list(LABEL_CONDITIONS)
+    for i, serial in enumerate(serials):
+        for width in widths:
+            for name in conditions:
+                image = render_label(serial, width=width, seed=seed + i,
+                                     **LABEL_CONDITIONS[name])
+                yield serial, width, name, encode_jpeg(image)
+
+
+class CatalogServer:
+    """Local HTTP stand-in for EXCEL_URL serving in-memory files"""
+
+    def __init__(self, files=None, host='127.0.0.1', port=0):
+        self.files = dict(files or {})
+        self.requests_served = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self, with_body):
+                path = self.path.split('?', 1)[0].lstrip('/')
+                if path not in server.files:
+                    self.send_error(404)
+                    return
+                content, content_type = server.files[path]
+                server.requests_served += 1
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                if with_body:
+                    self.wfile.write(content)
+
+            def do_HEAD(self):
+                self._respond(False)
+
+            def do_GET(self):
+                self._respond(True)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    def add_file(self, name, content, content_type='application/octet-stream'):
+        self.files[name] = (content, content_type)
+
+    def add_catalog(self, df, name='catalog'):
+        """Publish a catalog as both <name>.xlsx and <name>.csv"""
+        self.add_file(f"{name}.xlsx", catalog_to_xlsx(df),
+                      'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        self.add_file(f"{name}.csv", catalog_to_csv(df), 'text/csv; charset=utf-8')
+
+    def url(self, name):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/{name}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Catalog server listening on {self.url('')}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,223 @@
+"""
+Tests for the verification decision logic: scan frame selection, the audit log
+and the cacheable lookup API. Run with: python -m pytest test_verification.py
+"""
+
+import gzip
+import json
+import os
+import tempfile
+import time
+
+# Keep the app's audit log out of the working tree
+os.environ.setdefault('AUDIT_DB_PATH', os.path.join(tempfile.mkdtemp(), 'audit_log.db'))
+
+import numpy as np
+import pytest
+
+import app as verification_app
+import synthetic_data
+from audit_log import SCHEMA, AuditLog, connect
+from frame_scanner import FrameSelector, score_frame
+
+
+def test_score_frame_rejects_blank_and_accepts_label():
+    blank = np.full((240, 320, 3), 200, np.uint8)
+    label = synthetic_data.render_label('505KRWZ35633', 320)
+    assert score_frame(blank)['score'] == 0
+    assert score_frame(label)['score'] > 0
+
+
+def test_selector_runs_first_candidate_immediately():
+    selector = FrameSelector(cooldown=1.0, margin=1.5, max_attempts=3)
+    assert not selector.should_run(now=0.0)
+    selector.offer(b'a', 100.0)
+    assert selector.should_run(now=0.0)
+    assert selector.take(now=0.0) == b'a'
+    assert selector.ocr_runs == 1
+    assert not selector.should_run(now=0.0)
+
+
+def test_selector_keeps_best_frame_in_window():
+    selector = FrameSelector()
+    selector.offer(b'low', 10.0)
+    selector.offer(b'high', 50.0)
+    selector.offer(b'mid', 30.0)
+    assert selector.frames_seen == 3
+    assert selector.take(now=0.0) == b'high'
+
+
+def test_selector_waits_for_cooldown_unless_clearly_better():
+    selector = FrameSelector(cooldown=1.0, margin=1.5, max_attempts=5)
+    selector.offer(b'first', 100.0)
+    selector.take(now=0.0)
+
+    selector.offer(b'similar', 120.0)
+    assert not selector.should_run(now=0.5)
+    assert selector.should_run(now=1.0)
+
+    selector.offer(b'better', 150.0)
+    assert selector.should_run(now=0.5)
+
+
+def test_selector_stops_at_attempt_cap():
+    selector = FrameSelector(cooldown=0.0, max_attempts=2)
+    for i in range(2):
+        selector.offer(b'frame', 100.0)
+        selector.take(now=float(i))
+    selector.offer(b'frame', 1000.0)
+    assert selector.exhausted
+    assert not selector.should_run(now=10.0)
+
+
+def test_health_reports_scan_support():
+    data = verification_app.app.test_client().get('/health').get_json()
+    assert data['scan_available'] is verification_app.SCAN_AVAILABLE
+
+
+def test_audit_log_counts_drops_when_queue_is_full(tmp_path, monkeypatch):
+    log = AuditLog(path=str(tmp_path / 'audit.db'), queue_size=2, enabled=True)
+    monkeypatch.setattr(log, '_ensure_writer', lambda: None)
+    for _ in range(5):
+        log.record('505KRWZ35633', 'manual', 'found')
+    assert log.stats()['queued'] == 2
+    assert log.stats()['dropped'] == 3
+
+
+def test_audit_log_writes_in_batches(tmp_path, monkeypatch):
+    log = AuditLog(path=str(tmp_path / 'audit.db'), batch_size=3, flush_interval=0.05, enabled=True)
+    ensure_writer = log._ensure_writer
+    monkeypatch.setattr(log, '_ensure_writer', lambda: None)
+    for i in range(7):
+        log.record(f'SERIAL{i}', 'manual', 'not_found')
+    ensure_writer()
+    log.flush()
+    assert log.stats() == {'queued': 0, 'dropped': 0, 'written': 7, 'batches': 3}
+
+
+def test_audit_summary_filters_not_found_by_window(tmp_path):
+    log = AuditLog(path=str(tmp_path / 'audit.db'), enabled=True)
+    now = time.time()
+    old = now - 3 * 86400
+    conn = connect(log.path)
+    conn.executescript(SCHEMA)
+    log._write(conn, [(old, 'OLDSERIAL', 'scan', 'not_found')] * 3
+               + [(now, 'NEWSERIAL', 'api', 'not_found'), (now, 'NEWSERIAL', 'manual', 'found'),
+                  (now, 'OUTAGESERIAL', 'manual', 'catalog_error')])
+    conn.close()
+
+    recent = log.summary(hours=24)
+    assert [row['serial'] for row in recent['top_not_found']] == ['NEWSERIAL']
+    assert recent['counts'] == {'api': {'not_found': 1}, 'manual': {'found': 1, 'catalog_error': 1}}
+
+    week = log.summary(hours=24 * 7)
+    assert [row['serial'] for row in week['top_not_found']] == ['OLDSERIAL', 'NEWSERIAL']
+    assert week['top_not_found'][0]['count'] == 3
+
+
+def test_audit_summary_requires_token(monkeypatch):
+    client = verification_app.app.test_client()
+    monkeypatch.delenv('AUDIT_TOKEN', raising=False)
+    assert client.get('/audit/summary').status_code == 403
+
+    monkeypatch.setenv('AUDIT_TOKEN', 'secret')
+    assert client.get('/audit/summary').status_code == 403
+    assert client.get('/audit/summary', headers={'X-Audit-Token': 'wrong'}).status_code == 403
+    assert client.get('/audit/summary', headers={'X-Audit-Token': 'sécret'}).status_code == 403
+    assert client.get('/audit/summary?token=secret').status_code == 403
+    response = client.get('/audit/summary', headers={'X-Audit-Token': 'secret'})
+    assert response.status_code == 200
+    assert 'top_not_found' in response.get_json()
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    df = synthetic_data.generate_catalog(rows=50, seed=3)
+    with synthetic_data.CatalogServer() as server:
+        server.add_catalog(df)
+        monkeypatch.setenv('EXCEL_URL', server.url('catalog.xlsx'))
+        monkeypatch.setitem(verification_app.catalog_state, 'generation', None)
+        yield server, df
+
+
+def test_api_serial_revalidates_with_304(catalog):
+    server, df = catalog
+    client = verification_app.app.test_client()
+    serial = df[synthetic_data.SERIAL_COLUMN].iloc[0]
+
+    first = client.get(f'/api/serial/{serial}')
+    assert first.status_code == 200
+    assert first.get_json()['valid'] is True
+    etag = first.headers['ETag']
+    assert 'max-age' in first.headers['Cache-Control']
+
+    served = server.requests_served
+    again = client.get(f'/api/serial/{serial}', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert server.requests_served == served
+
+
+def test_api_serial_etag_depends_on_language(catalog):
+    _, df = catalog
+    client = verification_app.app.test_client()
+    serial = df[synthetic_data.SERIAL_COLUMN].iloc[0]
+    english = client.get(f'/api/serial/{serial}?lang=en')
+    arabic = client.get(f'/api/serial/{serial}?lang=ar')
+    assert english.headers['ETag'] != arabic.headers['ETag']
+    assert english.get_json()['message'] != arabic.get_json()['message']
+
+
+def test_api_serial_gzips_when_accepted(catalog):
+    _, df = catalog
+    client = verification_app.app.test_client()
+    serial = df[synthetic_data.SERIAL_COLUMN].iloc[0]
+    response = client.get(f'/api/serial/{serial}', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data))['serial_number'] == serial
+
+
+def test_api_serial_respects_refused_gzip(catalog):
+    _, df = catalog
+    client = verification_app.app.test_client()
+    serial = df[synthetic_data.SERIAL_COLUMN].iloc[0]
+    response = client.get(f'/api/serial/{serial}', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json()['serial_number'] == serial
+
+
+def test_api_serial_does_not_cache_when_catalog_unreadable(catalog, monkeypatch):
+    server, _ = catalog
+    monkeypatch.setenv('EXCEL_URL', server.url('missing.xlsx'))
+    response = verification_app.app.test_client().get('/api/serial/505KRWZ35633')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-store'
+    assert 'ETag' not in response.headers
+
+
+def test_api_serial_notices_catalog_change_after_check_interval(catalog, monkeypatch):
+    server, df = catalog
+    client = verification_app.app.test_client()
+    serial = df[synthetic_data.SERIAL_COLUMN].iloc[0]
+    etag = client.get(f'/api/serial/{serial}').headers['ETag']
+
+    server.add_catalog(df.iloc[1:])
+    assert client.get(f'/api/serial/{serial}', headers={'If-None-Match': etag}).status_code == 304
+
+    monkeypatch.setattr(verification_app, 'CATALOG_CHECK_INTERVAL', 0)
+    response = client.get(f'/api/serial/{serial}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['valid'] is False
+
+
+def test_catalog_outage_is_not_audited_as_not_found(monkeypatch):
+    records = []
+    monkeypatch.setattr(verification_app.audit_log, 'record', lambda *args: records.append(args))
+    with synthetic_data.CatalogServer() as server:
+        monkeypatch.setenv('EXCEL_URL', server.url('missing.xlsx'))
+        response = verification_app.app.test_client().post(
+            '/check_serial', data={'serial_number': '505KRWZ35633', 'lang': 'en'})
+    assert response.get_json()['valid'] is False
+    assert records == [('505KRWZ35633', 'manual', 'catalog_error')]